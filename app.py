@@ -9,6 +9,13 @@ from io import BytesIO
 from datetime import datetime
 import re
 
+from cache import SharedCache
+
+@st.cache_resource
+def get_shared_cache():
+    """One SharedCache per worker process, shared by all of its sessions"""
+    return SharedCache()
+
 class ClarifaiSystem:
     def __init__(self, api_key, user_id, app_id, workflow_id):
         self.api_key = api_key
@@ -19,6 +26,7 @@ class ClarifaiSystem:
         self.stub = service_pb2_grpc.V2Stub(self.channel)
         self.metadata = (('authorization', f'Key {self.api_key}'),)
         self.translator = Translator()
+        self.cache = get_shared_cache()
         
         # Define medical-related keywords and phrases
         self.medical_keywords = [
@@ -61,11 +69,58 @@ class ClarifaiSystem:
         # Check if any medical keyword is present in the text
         return any(keyword in text_lower for keyword in self.medical_keywords)
 
+    def translate(self, text, source_lang, target_lang):
+        """Translate text, reusing results already produced by any worker"""
+        translated = self.cache.get_or_compute(
+            "translation",
+            (source_lang, target_lang, text),
+            lambda: self.translator.translate(text, src=source_lang, dest=target_lang).text
+        )
+        # googletrans can come back with no text; fall back to the original.
+        return translated if translated is not None else text
+
+    def run_workflow(self, raw_text):
+        """Run the Clarifai workflow, returning (ok, response text or error description)
+
+        Answers are cached in plaintext in the shared cache file and returned
+        to any session that sends the same prompt until the "response" TTL
+        runs out.
+        """
+        key = self.cache.make_key(self.user_id, self.app_id, self.workflow_id, raw_text)
+        cached = self.cache.get("response", key)
+        if cached is not None:
+            return True, cached
+
+        workflow_response = self.stub.PostWorkflowResults(
+            service_pb2.PostWorkflowResultsRequest(
+                user_app_id=resources_pb2.UserAppIDSet(
+                    user_id=self.user_id,
+                    app_id=self.app_id
+                ),
+                workflow_id=self.workflow_id,
+                inputs=[
+                    resources_pb2.Input(
+                        data=resources_pb2.Data(
+                            text=resources_pb2.Text(raw=raw_text)
+                        )
+                    )
+                ]
+            ),
+            metadata=self.metadata
+        )
+
+        if workflow_response.status.code != status_code_pb2.SUCCESS:
+            return False, workflow_response.status.description
+
+        response_text = workflow_response.results[0].outputs[-1].data.text.raw
+        self.cache.set("response", key, response_text)
+        return True, response_text
+
     def get_qa_response(self, question, source_lang, target_lang):
         try:
             # Translate to English first for content checking
             if source_lang != 'en':
-                question_en = self.translator.translate(question, src=source_lang, dest='en').text
+                question_en = self.translate(question, source_lang, 'en')
             else:
                 question_en = question
 
@@ -76,32 +131,12 @@ class ClarifaiSystem:
                     "response": "Please ask only medical or health-related questions. For other topics, please use a different service."
                 }
 
-            workflow_response = self.stub.PostWorkflowResults(
-                service_pb2.PostWorkflowResultsRequest(
-                    user_app_id=resources_pb2.UserAppIDSet(
-                        user_id=self.user_id,
-                        app_id=self.app_id
-                    ),
-                    workflow_id=self.workflow_id,
-                    inputs=[
-                        resources_pb2.Input(
-                            data=resources_pb2.Data(
-                                text=resources_pb2.Text(raw=question_en)
-                            )
-                        )
-                    ]
-                ),
-                metadata=self.metadata
-            )
-
-            if workflow_response.status.code != status_code_pb2.SUCCESS:
-                return {"status": "error", "response": f"Workflow failed: {workflow_response.status.description}"}
-
-            response_text = workflow_response.results[0].outputs[-1].data.text.raw
+            ok, response_text = self.run_workflow(question_en)
+            if not ok:
+                return {"status": "error", "response": f"Workflow failed: {response_text}"}
             
             if target_lang != 'en':
-                translated = self.translator.translate(response_text, dest=target_lang)
-                response_text = translated.text
+                response_text = self.translate(response_text, 'auto', target_lang)
 
             return {"status": "success", "response": response_text}
         except Exception as e:
@@ -110,7 +145,7 @@ class ClarifaiSystem:
     def analyze_symptoms(self, symptoms, source_lang, target_lang):
         try:
             if source_lang != 'en':
-                symptoms_en = self.translator.translate(symptoms, src=source_lang, dest='en').text
+                symptoms_en = self.translate(symptoms, source_lang, 'en')
             else:
                 symptoms_en = symptoms
 
@@ -133,32 +168,12 @@ Please note: This is not a diagnosis, just an initial analysis to help prepare f
 
 Patient's symptoms: {symptoms_en}"""
 
-            workflow_response = self.stub.PostWorkflowResults(
-                service_pb2.PostWorkflowResultsRequest(
-                    user_app_id=resources_pb2.UserAppIDSet(
-                        user_id=self.user_id,
-                        app_id=self.app_id
-                    ),
-                    workflow_id=self.workflow_id,
-                    inputs=[
-                        resources_pb2.Input(
-                            data=resources_pb2.Data(
-                                text=resources_pb2.Text(raw=medical_prompt)
-                            )
-                        )
-                    ]
-                ),
-                metadata=self.metadata
-            )
-
-            if workflow_response.status.code != status_code_pb2.SUCCESS:
-                return {"status": "error", "response": f"Analysis failed: {workflow_response.status.description}"}
-
-            response_text = workflow_response.results[0].outputs[-1].data.text.raw
+            ok, response_text = self.run_workflow(medical_prompt)
+            if not ok:
+                return {"status": "error", "response": f"Analysis failed: {response_text}"}
             
             if target_lang != 'en':
-                translated = self.translator.translate(response_text, dest=target_lang)
-                response_text = translated.text
+                response_text = self.translate(response_text, 'auto', target_lang)
 
             return {"status": "success", "response": response_text}
         except Exception as e:
@@ -167,7 +182,7 @@ Patient's symptoms: {symptoms_en}"""
     def get_diet_recommendations(self, health_conditions, source_lang, target_lang):
         try:
             if source_lang != 'en':
-                conditions_en = self.translator.translate(health_conditions, src=source_lang, dest='en').text
+                conditions_en = self.translate(health_conditions, source_lang, 'en')
             else:
                 conditions_en = health_conditions
 
@@ -182,32 +197,12 @@ Please provide only:
 
 Note: This is general dietary guidance that should be reviewed with a healthcare provider."""
 
-            workflow_response = self.stub.PostWorkflowResults(
-                service_pb2.PostWorkflowResultsRequest(
-                    user_app_id=resources_pb2.UserAppIDSet(
-                        user_id=self.user_id,
-                        app_id=self.app_id
-                    ),
-                    workflow_id=self.workflow_id,
-                    inputs=[
-                        resources_pb2.Input(
-                            data=resources_pb2.Data(
-                                text=resources_pb2.Text(raw=diet_prompt)
-                            )
-                        )
-                    ]
-                ),
-                metadata=self.metadata
-            )
-
-            if workflow_response.status.code != status_code_pb2.SUCCESS:
-                return {"status": "error", "response": f"Diet recommendations failed: {workflow_response.status.description}"}
-
-            response_text = workflow_response.results[0].outputs[-1].data.text.raw
+            ok, response_text = self.run_workflow(diet_prompt)
+            if not ok:
+                return {"status": "error", "response": f"Diet recommendations failed: {response_text}"}
             
             if target_lang != 'en':
-                translated = self.translator.translate(response_text, dest=target_lang)
-                response_text = translated.text
+                response_text = self.translate(response_text, 'auto', target_lang)
 
             return {"status": "success", "response": response_text}
         except Exception as e:
@@ -216,10 +211,14 @@ Note: This is general dietary guidance that should be reviewed with a healthcare
 
     def generate_voice(self, text, lang):
         try:
-            tts = gTTS(text=text, lang=lang)
-            audio_fp = BytesIO()
-            tts.write_to_fp(audio_fp)
-            return {"status": "success", "audio": base64.b64encode(audio_fp.getvalue()).decode()}
+            def synthesize():
+                tts = gTTS(text=text, lang=lang)
+                audio_fp = BytesIO()
+                tts.write_to_fp(audio_fp)
+                return base64.b64encode(audio_fp.getvalue()).decode()
+
+            audio = self.cache.get_or_compute("tts", (lang, text), synthesize)
+            return {"status": "success", "audio": audio}
         except Exception as e:
             return {"status": "error", "response": f"Error generating voice: {str(e)}"}
 
@@ -0,0 +1,146 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from clarifai_grpc.grpc.api.status import status_code_pb2
+
+ANSWER = "Drink plenty of fluids, rest, and see a doctor if the fever lasts more than three days. " * 20
+AUDIO_BYTES = 48 * 1024
+
+
+class FakeStub:
+    """Stands in for the Clarifai V2Stub, answering after `latency` seconds"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def PostWorkflowResults(self, request, metadata=None):
+        if self.latency:
+            time.sleep(self.latency)
+        raw = request.inputs[0].data.text.raw
+        output = SimpleNamespace(data=SimpleNamespace(text=SimpleNamespace(raw=f"{ANSWER}\n{raw[-40:]}")))
+        return SimpleNamespace(
+            status=SimpleNamespace(code=status_code_pb2.SUCCESS, description=""),
+            results=[SimpleNamespace(outputs=[output])]
+        )
+
+
+class FakeTranslator:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def translate(self, text, src="auto", dest="en"):
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(text=f"[{dest}] {text}")
+
+
+class FakeTTS:
+    latency = 0
+
+    def __init__(self, text, lang):
+        self.text = text
+
+    def write_to_fp(self, fp):
+        if self.latency:
+            time.sleep(self.latency)
+        fp.write(self.text.encode("utf-8").ljust(AUDIO_BYTES, b"\0"))
+
+
+def make_system(latency):
+    # Imported here so each worker process builds its own app module, the way
+    # each Streamlit worker does.
+    import app
+
+    # st.cache_resource warns when called outside a running Streamlit app.
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+
+    FakeTTS.latency = latency
+    app.gTTS = FakeTTS
+    system = app.ClarifaiSystem(api_key="bench", user_id="bench", app_id="bench", workflow_id="bench")
+    system.stub = FakeStub(latency)
+    system.translator = FakeTranslator(latency)
+    return system
+
+
+def handle_request(system, i, distinct):
+    """One user turn: a Q&A, symptom or diet request in Hindi, then its voice answer"""
+    n = i % distinct
+    kind = n % 3
+    if kind == 0:
+        result = system.get_qa_response(f"question {n}: what should I take for a fever?", "hi", "hi")
+    elif kind == 1:
+        result = system.analyze_symptoms(f"patient {n}: fever and cough for two days", "hi", "hi")
+    else:
+        result = system.get_diet_recommendations(f"case {n}: diabetes and hypertension", "hi", "hi")
+    if result["status"] != "success":
+        raise RuntimeError(result["response"])
+    system.generate_voice(result["response"], lang="hi")
+
+
+def worker(cache_path, latency, indices, distinct, ready):
+    os.environ["CAREPULSE_CACHE_PATH"] = cache_path
+    system = make_system(latency)
+    ready.wait()
+    for i in indices:
+        handle_request(system, i, distinct)
+
+
+def run(workers, requests, distinct, latency):
+    # Every run gets a fresh, empty cache so later runs don't read entries
+    # written by earlier ones, and the same requests split across the
+    # workers, so the number of cache misses doesn't depend on worker count.
+    # Requests are interleaved, as a proxy spreading users would, so workers
+    # don't all miss on the same input at once.
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, "bench.sqlite3")
+        # The parent is the last party, so the clock starts only once every
+        # worker has imported the app and built its ClarifaiSystem.
+        ready = multiprocessing.Barrier(workers + 1)
+        processes = [
+            multiprocessing.Process(
+                target=worker,
+                args=(cache_path, latency, range(w, requests, workers), distinct, ready)
+            )
+            for w in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        ready.wait()
+        started = time.perf_counter()
+        for process in processes:
+            process.join()
+            if process.exitcode:
+                raise SystemExit(f"Benchmark worker failed with exit code {process.exitcode}")
+        elapsed = time.perf_counter() - started
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure ClarifaiSystem request throughput against worker count, with stubbed network calls"
+    )
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--requests", type=int, default=2400, help="Total requests, split across the workers")
+    parser.add_argument("--distinct", type=int, default=200,
+                        help="Distinct inputs; requests cycle through them, which sets the cache hit rate")
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="Simulated latency of each Clarifai, translation and TTS call")
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}, requests: {args.requests}, distinct inputs: {args.distinct}, "
+          f"network latency: {args.latency_ms} ms, cache: empty at the start of each run")
+    print(f"{'workers':>7} {'req/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        throughput = run(workers, args.requests, args.distinct, args.latency_ms / 1000)
+        baseline = baseline or throughput
+        print(f"{workers:>7} {throughput:>10.0f} {throughput / baseline:>7.2f}x", flush=True)
+
+
+if __name__ == "__main__":
+    main()
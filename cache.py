@@ -0,0 +1,176 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.environ.get("CAREPULSE_CACHE_PATH", os.path.join(".cache", "carepulse.sqlite3"))
+
+# The whole file is memory-mapped, so pruning keeps it under this size.
+MAX_BYTES = int(os.environ.get("CAREPULSE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+DAY = 24 * 60 * 60
+
+# Workflow answers expire quickly so that a changed Clarifai workflow, or a
+# bad answer, is not served for long under the same workflow_id. A TTL of 0
+# turns caching off for that namespace; nothing is written to disk.
+TTLS = {
+    "translation": int(os.environ.get("CAREPULSE_TRANSLATION_TTL", 30 * DAY)),
+    "tts": int(os.environ.get("CAREPULSE_TTS_TTL", 30 * DAY)),
+    "response": int(os.environ.get("CAREPULSE_RESPONSE_TTL", DAY)),
+}
+DEFAULT_TTL = DAY
+
+PRUNE_EVERY = 100
+
+
+class SharedCache:
+    """Disk-backed key/value cache shared by every app worker on the node.
+
+    Entries live in one SQLite file in WAL mode, so any number of worker
+    processes can read while one writes, and reads go through a memory map
+    of the database file instead of read() syscalls. Entries expire after
+    their namespace's TTL, and the oldest ones are dropped once the file
+    grows past MAX_BYTES.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES, ttls=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(TTLS, **(ttls or {}))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        conn = self._connection()
+        # auto_vacuum only takes effect on a new database, before any table exists.
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_created_at ON cache (created_at)")
+        conn.commit()
+
+    def _connection(self):
+        # Streamlit serves each session on its own thread, and sqlite3
+        # connections must not be shared across threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute(f"PRAGMA mmap_size={self.max_bytes}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _ttl(self, namespace):
+        return self.ttls.get(namespace, DEFAULT_TTL)
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def get(self, namespace, key):
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND created_at >= ?",
+            (namespace, key, time.time() - self._ttl(namespace)),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace, key, value):
+        if self._ttl(namespace) <= 0:
+            return
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, time.time()),
+        )
+        conn.commit()
+        # Counted across every session thread sharing this instance, so the
+        # cache gets pruned as the process as a whole writes.
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % PRUNE_EVERY == 0
+        if due:
+            self.prune()
+
+    def get_or_compute(self, namespace, parts, compute):
+        """Return the cached value for `parts`, calling `compute()` on a miss.
+
+        A `None` result is returned as-is and not cached.
+        """
+        key = self.make_key(*parts)
+        value = self.get(namespace, key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(namespace, key, value)
+        return value
+
+    def _size(self, conn):
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return (page_count - freelist_count) * page_size
+
+    def prune(self):
+        """Drop expired entries, then the oldest ones until the file fits in MAX_BYTES"""
+        conn = self._connection()
+        now = time.time()
+        namespaces = [row[0] for row in conn.execute("SELECT DISTINCT namespace FROM cache")]
+        for namespace in namespaces:
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND created_at < ?",
+                (namespace, now - self._ttl(namespace)),
+            )
+        while self._size(conn) > self.max_bytes:
+            rows = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            if not rows:
+                break
+            conn.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY created_at LIMIT ?)",
+                (max(rows // 10, 1),),
+            )
+        conn.commit()
+        self._shrink(conn)
+
+    def clear(self, namespace=None):
+        conn = self._connection()
+        if namespace is None:
+            conn.execute("DELETE FROM cache")
+        else:
+            conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+        conn.commit()
+        self._shrink(conn)
+
+    def _shrink(self, conn):
+        # Executed on its own, incremental_vacuum frees a single page; run it
+        # as a script so it steps to completion. The checkpoint then moves the
+        # result out of the WAL so the main file actually shrinks.
+        conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the shared CarePulse cache")
+    parser.add_argument("--path", default=CACHE_PATH)
+    parser.add_argument("--prune", action="store_true", help="Drop expired entries and shrink to the size limit")
+    parser.add_argument("--clear", nargs="?", const="all", metavar="NAMESPACE",
+                        help="Delete every entry, or only those in NAMESPACE (translation, tts, response)")
+    args = parser.parse_args()
+
+    cache = SharedCache(args.path)
+    if args.clear:
+        cache.clear(None if args.clear == "all" else args.clear)
+    if args.prune:
+        cache.prune()
+
+
+if __name__ == "__main__":
+    main()
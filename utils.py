@@ -1,21 +1,35 @@
-from langchain_huggingface import HuggingFaceEmbeddings
+import os
+
+import faiss
+from langchain_classic.chains import RetrievalQA
+from langchain_huggingface import HuggingFaceEmbeddings, HuggingFacePipeline
 from langchain_community.vectorstores import FAISS
-from langchain import HuggingFacePipeline
+
+# Folder written by ingest.py, holding index.faiss and index.pkl
+FAISS_INDEX = os.environ.get("FAISS_INDEX", "vectorstore")
 
 # Use a local model instead of OpenAI
 local_model_name = "distilgpt2"  # Or any other compatible model
 
+# Memory-map the index read-only instead of copying it into each process, so
+# every app worker on the node shares the same index pages. IO_FLAG_MMAP_IFC
+# covers flat indexes on newer faiss releases; IO_FLAG_MMAP covers IVF lists.
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+
+
 def qa_pipeline():
     # Initialize HuggingFace embeddings
     embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    
+
     # Load the FAISS vectorstore
-    db = FAISS.load_local(FAISS_INDEX, embeddings)
+    db = FAISS.load_local(
+        FAISS_INDEX, embeddings, allow_dangerous_deserialization=True, io_flags=MMAP_FLAGS
+    )
 
     # Use a local model instead of OpenAI
-    llm = HuggingFacePipeline.from_pretrained(local_model_name)
+    llm = HuggingFacePipeline.from_model_id(model_id=local_model_name, task="text-generation")
 
     # Initialize the chain with the local model
     chain = RetrievalQA.from_chain_type(llm=llm, chain_type="stuff", retriever=db.as_retriever())
-    
+
     return chain
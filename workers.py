@@ -0,0 +1,141 @@
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from cache import SharedCache
+
+NGINX_TEMPLATE = """upstream carepulse {{
+    # Streamlit keeps each session's state in the worker that served it,
+    # so a client must keep talking to the same worker.
+    ip_hash;
+{servers}
+}}
+
+map $http_upgrade $connection_upgrade {{
+    default upgrade;
+    ''      close;
+}}
+
+server {{
+    listen {listen};
+
+    location / {{
+        proxy_pass http://carepulse;
+        proxy_http_version 1.1;
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection $connection_upgrade;
+        proxy_set_header Host $host;
+        proxy_read_timeout 86400;
+    }}
+}}
+"""
+
+
+def nginx_config(workers, base_port, listen):
+    # A dead worker is taken out of rotation after one failed connection, so
+    # its clients get rehashed to a live one until it is restarted.
+    servers = "\n".join(
+        f"    server 127.0.0.1:{base_port + i} max_fails=1 fail_timeout=10s;" for i in range(workers)
+    )
+    return NGINX_TEMPLATE.format(servers=servers, listen=listen)
+
+
+def start_worker(script, port, cache_path):
+    env = dict(os.environ, CAREPULSE_CACHE_PATH=cache_path)
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", script,
+            "--server.port", str(port),
+            "--server.address", "127.0.0.1",
+            "--server.headless", "true",
+        ],
+        env=env
+    )
+
+
+# A worker that keeps exiting this soon after a (re)start is treated as
+# broken (port in use, bad script) rather than crashed.
+STARTUP_GRACE = 30
+MAX_RESTARTS = 5
+MAX_BACKOFF = 60
+PRUNE_INTERVAL = 60 * 60
+
+
+def stop_workers(processes):
+    for process in processes.values():
+        if process.poll() is None:
+            process.send_signal(signal.SIGINT)
+    for process in processes.values():
+        process.wait()
+
+
+def supervise(script, workers, base_port, cache_path):
+    """Run the workers, restarting any that exit, until interrupted"""
+
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, terminate)
+
+    processes = {base_port + i: start_worker(script, base_port + i, cache_path) for i in range(workers)}
+    started = {port: time.monotonic() for port in processes}
+    failures = {port: 0 for port in processes}
+    restart_at = {}
+    print(f"Started {workers} workers on ports {base_port}-{base_port + workers - 1}", flush=True)
+    cache = SharedCache(cache_path)
+    last_prune = time.monotonic()
+    try:
+        while True:
+            time.sleep(1)
+            now = time.monotonic()
+            for port, process in processes.items():
+                if port in restart_at:
+                    if now >= restart_at[port]:
+                        del restart_at[port]
+                        processes[port] = start_worker(script, port, cache_path)
+                        started[port] = now
+                    continue
+                code = process.poll()
+                if code is None:
+                    continue
+                failures[port] = failures[port] + 1 if now - started[port] < STARTUP_GRACE else 1
+                if failures[port] > MAX_RESTARTS:
+                    print(f"Worker on port {port} exited with code {code} {failures[port]} times in a row "
+                          f"right after starting, giving up", file=sys.stderr, flush=True)
+                    raise SystemExit(1)
+                delay = min(2 ** (failures[port] - 1), MAX_BACKOFF)
+                print(f"Worker on port {port} exited with code {code}, restarting in {delay}s",
+                      file=sys.stderr, flush=True)
+                restart_at[port] = now + delay
+            if now - last_prune >= PRUNE_INTERVAL:
+                cache.prune()
+                last_prune = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_workers(processes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several Streamlit workers behind a sticky reverse proxy")
+    parser.add_argument("--script", default="app.py")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--base-port", type=int, default=8601)
+    parser.add_argument("--listen", type=int, default=8501, help="Port the reverse proxy listens on")
+    parser.add_argument("--cache-path", default=os.path.abspath(os.path.join(".cache", "carepulse.sqlite3")))
+    parser.add_argument("--print-nginx", action="store_true", help="Print the nginx config and exit")
+    args = parser.parse_args()
+
+    if args.print_nginx:
+        print(nginx_config(args.workers, args.base_port, args.listen))
+        return
+
+    SharedCache(args.cache_path).prune()
+    supervise(args.script, args.workers, args.base_port, args.cache_path)
+
+
+if __name__ == "__main__":
+    main()